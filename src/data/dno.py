@@ -21,6 +21,9 @@ from data.utils import lat_lon_to_osgb
 dir_path = os.path.dirname(os.path.realpath(__file__))
 dno_local_file = f"{dir_path}/dno"
 
+# returned when a point doesn't fall inside any dno region
+dno_unknown = {"dno_id": "999", "name": "unknown", "long_name": "unknown"}
+
 
 def download_dno():
 
@@ -65,7 +68,7 @@ def get_dno(latitude, longitude) -> dict:
         dno_dict = {"dno_id": str(dno_id), "name": name, "long_name": long_name}
         print(dno_dict)
     else:
-        dno_dict = {"dno_id": "999", "name": "unknown", "long_name": "unknown"}
+        dno_dict = dict(dno_unknown)
 
     return dno_dict
 
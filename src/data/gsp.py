@@ -9,6 +9,9 @@ from data.utils import lat_lon_to_osgb
 
 dir_path = os.path.dirname(os.path.realpath(__file__))
 gsp_local_file = f"{dir_path}/gsp"
+
+# returned when a point doesn't fall inside any gsp region
+gsp_unknown = {"gsp_id": "999", "name": "unknown"}
 gsp_names = pd.read_csv(f"{dir_path}/gsp_new_ids_and_names-edited.csv")
 
 
@@ -58,6 +61,6 @@ def get_gsp(latitude, longitude) -> dict:
         gsp_dict = {"gsp_id": str(gsp_id), "name": name}
         print(gsp_dict)
     else:
-        gsp_dict = {"gsp_id": "999", "name": "unknown"}
+        gsp_dict = dict(gsp_unknown)
 
     return gsp_dict
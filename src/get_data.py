@@ -14,7 +14,7 @@ from typing import List, Optional
 import sqlalchemy as sa
 from sqlalchemy.orm.session import Session
 from sqlalchemy.sql.functions import func
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
 
 from nowcasting_datamodel.models.gsp import LocationSQL
 from nowcasting_datamodel.models import MLModelSQL
@@ -23,6 +23,7 @@ from nowcasting_datamodel.models.metric import (
     MetricSQL,
     MetricValueSQL,
 )
+from pvsite_datamodel.read import get_user_by_email, get_site_group_by_name
 from pvsite_datamodel.sqlmodels import UserSQL, SiteGroupSQL, SiteSQL, ForecastValueSQL, ForecastSQL
 
 from data.gsp import get_gsp
@@ -110,6 +111,66 @@ def get_metric_value(
 
 
 
+def get_user_with_site_group(session: Session, email: str) -> UserSQL:
+    """Get a user, with their site group and its sites eagerly loaded.
+    :param session: database session
+    :param email: the email of the user
+    """
+    query = session.query(UserSQL)
+
+    query = query.options(
+        selectinload(UserSQL.site_group).selectinload(SiteGroupSQL.sites)
+    )
+
+    query = query.filter(UserSQL.email == email)
+
+    user = query.first()
+
+    if user is None:
+        # get_user_by_email creates the user if it doesn't exist yet
+        get_user_by_email(session=session, email=email)
+        user = query.first()
+
+    return user
+
+
+def get_site_group_with_sites(session: Session, site_group_name: str) -> SiteGroupSQL:
+    """Get a site group, with its sites and users eagerly loaded.
+    :param session: database session
+    :param site_group_name: the name of the site group
+    """
+    query = session.query(SiteGroupSQL)
+
+    query = query.options(
+        selectinload(SiteGroupSQL.sites), selectinload(SiteGroupSQL.users)
+    )
+
+    query = query.filter(SiteGroupSQL.site_group_name == site_group_name)
+
+    site_group = query.first()
+
+    if site_group is None:
+        # get_site_group_by_name creates the site group if it doesn't exist yet
+        get_site_group_by_name(session=session, site_group_name=site_group_name)
+        site_group = query.first()
+
+    return site_group
+
+
+def get_all_site_ids(session: Session) -> List:
+    """Get the site uuid and client site id of all sites.
+
+    Only the two id columns are selected, which is much lighter than
+    loading full SiteSQL objects.
+    :param session: database session
+    """
+    query = sa.select(SiteSQL.site_uuid, SiteSQL.client_site_id)
+
+    site_ids = session.execute(query).all()
+
+    return site_ids
+
+
 def get_site_by_client_site_id(session: Session, client_site_id: str) -> List[SiteSQL]:
     """Get site by client site id.
     :param session: database session
@@ -1,76 +1,121 @@
 """This module contains functions to get details from the database for a user, site or site group"""
 
+import os
+
 import streamlit as st
 import re
 from datetime import datetime
+from operator import attrgetter
+from pvsite_datamodel.connection import DatabaseConnection
 from pvsite_datamodel.read import (
-    get_user_by_email,
     get_site_by_uuid,
-    get_site_group_by_name
 )
 from pvsite_datamodel.sqlmodels import SiteAssetType
 
+from get_data import get_user_with_site_group, get_site_group_with_sites
+
+_site_uuid_and_client_id = attrgetter("site_uuid", "client_site_id")
+
+
+# cached database connection, so the engine is only created once per server
+@st.cache_resource
+def _get_connection():
+    """Get the database connection, cached so the engine is not rebuilt every rerun"""
+    return DatabaseConnection(url=os.environ["SITES_DB_URL"], echo=False)
+
+
+# format sites as {"site_uuid": ..., "client_site_id": ...} dicts
+def _sites_to_dicts(sites):
+    """Format a list of sites for display"""
+    return [
+        {"site_uuid": str(site_uuid), "client_site_id": str(client_site_id)}
+        for site_uuid, client_site_id in map(_site_uuid_and_client_id, sites)
+    ]
+
+
 # get details for one user
 def get_user_details(session, email: str):
     """Get the user details from the database"""
-    user_details = get_user_by_email(session=session, email=email)
+    user_details = get_user_with_site_group(session=session, email=email)
     user_site_group = user_details.site_group.site_group_name
     user_site_count = len(user_details.site_group.sites)
-    user_sites = [
-        {"site_uuid": str(site.site_uuid), "client_site_id": str(site.client_site_id)}
-        for site in user_details.site_group.sites
-    ]
+    user_sites = _sites_to_dicts(user_details.site_group.sites)
     return user_sites, user_site_group, user_site_count
 
 
+# site fields which are displayed as plain strings, in display order
+_SITE_FIELD_KEYS = (
+    "site_uuid",
+    "client_site_id",
+    "client_site_name",
+    "latitude",
+    "longitude",
+    "country",
+    "region",
+    "DNO",
+    "GSP",
+    "tilt",
+    "orientation",
+    "ml_model_uuid",
+)
+_get_site_fields = attrgetter(
+    "site_uuid",
+    "client_site_id",
+    "client_site_name",
+    "latitude",
+    "longitude",
+    "country",
+    "region",
+    "dno",
+    "gsp",
+    "tilt",
+    "orientation",
+    "ml_model_uuid",
+)
+
+
 # get details for one site
 def get_site_details(session, site_uuid: str):
     """Get the site details for one site"""
     site = get_site_by_uuid(session=session, site_uuid=site_uuid)
-    
+
     if isinstance(site.asset_type, SiteAssetType):
         asset_type_value = str(site.asset_type.name.lower())  # 'pv' or 'wind'
     else:
         asset_type_value = str(site.asset_type)
-        
-    site_details = {
-        "site_uuid": str(site.site_uuid),
-        "client_site_id": str(site.client_site_id),
-        "client_site_name": str(site.client_site_name),
-        "site_group_names": [
-            site_group.site_group_name for site_group in site.site_groups
-        ],
-        "latitude": str(site.latitude),
-        "longitude": str(site.longitude),
-        "country": str(site.country),
-        "asset_type": asset_type_value,
-        "region": str(site.region),
-        "DNO": str(site.dno),
-        "GSP": str(site.gsp),
-        "tilt": str(site.tilt),
-        "orientation": str(site.orientation),
-        "inverter_capacity_kw": (f"{site.inverter_capacity_kw} kw"),
-        "module_capacity_kw": (f"{site.module_capacity_kw} kw"),
-        "capacity": (f"{site.capacity_kw} kw"),
-        "ml_model_uuid": str(site.ml_model_uuid),
-        "date_added": (site.created_utc.strftime("%Y-%m-%d")),
-    }
+
+    site_details = dict(zip(_SITE_FIELD_KEYS, map(str, _get_site_fields(site))))
+    site_details["site_group_names"] = [
+        site_group.site_group_name for site_group in site.site_groups
+    ]
+    site_details["asset_type"] = asset_type_value
+    site_details["inverter_capacity_kw"] = f"{site.inverter_capacity_kw} kw"
+    site_details["module_capacity_kw"] = f"{site.module_capacity_kw} kw"
+    site_details["capacity"] = f"{site.capacity_kw} kw"
+    site_details["date_added"] = site.created_utc.strftime("%Y-%m-%d")
 
     if site.ml_model_uuid is not None:
         site_details["ml_model_name"] = site.ml_model.name
 
     return site_details
 
+
+# cached site details, so repeat views of the same site skip the database
+@st.cache_data(ttl=60, show_spinner=False)
+def _site_details_cached(url: str, site_uuid: str):
+    """Get the site details for one site, cached across reruns"""
+    connection = _get_connection()
+    with connection.get_session() as session:
+        return get_site_details(session=session, site_uuid=site_uuid)
+
+
 # get details for one site group
 def get_site_group_details(session, site_group_name: str):
     """Get the site group details from the database"""
-    site_group_uuid = get_site_group_by_name(
+    site_group_uuid = get_site_group_with_sites(
         session=session, site_group_name=site_group_name
     )
-    site_group_sites = [
-        {"site_uuid": str(site.site_uuid), "client_site_id": str(site.client_site_id)}
-        for site in site_group_uuid.sites
-    ]
-    site_group_users = [user.email for user in site_group_uuid.users]
+    site_group_sites = _sites_to_dicts(site_group_uuid.sites)
+    site_group_users = list(map(attrgetter("email"), site_group_uuid.users))
     return site_group_sites, site_group_users
 
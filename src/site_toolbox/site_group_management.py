@@ -6,34 +6,34 @@ from pvsite_datamodel.read import (
     get_all_sites,
     get_user_by_email,
     get_site_by_uuid,
-    get_site_group_by_name
 )
 
-from get_data import get_site_by_client_site_id
+from get_data import get_site_group_with_sites
+from site_toolbox.get_details import _sites_to_dicts
 
 from pvsite_datamodel.write.user_and_site import (
-    add_site_to_site_group,
     update_user_site_group,
 )
 
 
-# select site by site_uuid or client_site_id 
-def select_site_id(dbsession, query_method: str):
-    """Select site by site_uuid or client_site_id"""
+# select site by site_uuid or client_site_id
+def select_site_id(dbsession, query_method: str, all_sites):
+    """Select site by site_uuid or client_site_id
+
+    :param dbsession: the database session
+    :param query_method: either "site_uuid" or "client_site_id"
+    :param all_sites: the sites already fetched by the caller"""
     if query_method == "site_uuid":
-        site_uuids = [str(site.site_uuid) for site in get_all_sites(session=dbsession)]
+        site_uuids = [str(site.site_uuid) for site in all_sites]
         selected_uuid = st.selectbox("Sites by site_uuid", site_uuids)
-    elif query_method == "client_site_id":
-        client_site_ids = [
-            str(site.client_site_id) for site in get_all_sites(session=dbsession)
-        ]
-        client_site_id = st.selectbox("Sites by client_site_id", client_site_ids)
-        site = get_site_by_client_site_id(
-            session=dbsession, client_site_id=client_site_id,
+    else:
+        uuid_by_client_site_id = {
+            str(site.client_site_id): str(site.site_uuid) for site in all_sites
+        }
+        client_site_id = st.selectbox(
+            "Sites by client_site_id", list(uuid_by_client_site_id)
         )
-        selected_uuid = str(site.site_uuid)
-    elif query_method not in ["site_uuid", "client_site_id"]:
-        raise ValueError("Please select a valid query_method.")
+        selected_uuid = uuid_by_client_site_id[client_site_id]
     return selected_uuid
 
 
@@ -41,17 +41,16 @@ def select_site_id(dbsession, query_method: str):
 # update a site's site groups
 def update_site_group(session, site_uuid: str, site_group_name: str):
     """Add a site to a site group"""
-    site_group = get_site_group_by_name(
+    site_group = get_site_group_with_sites(
         session=session, site_group_name=site_group_name
     )
-    site_group_sites = add_site_to_site_group(
-        session=session, site_uuid=site_uuid, site_group_name=site_group_name
-    )
-    site_group_sites = [
-        {"site_uuid": str(site.site_uuid), "client_site_id": str(site.client_site_id)}
-        for site in site_group.sites
-    ]
     site = get_site_by_uuid(session=session, site_uuid=site_uuid)
+
+    if site not in site_group.sites:
+        site_group.sites.append(site)
+        session.commit()
+
+    site_group_sites = _sites_to_dicts(site_group.sites)
     site_site_groups = [site_group.site_group_name for site_group in site.site_groups]
     return site_group, site_group_sites, site_site_groups
 
@@ -78,23 +77,23 @@ def add_all_sites_to_ocf_group(session, site_group_name="ocf"):
     :param site_group_name: the name of the site group"""
     all_sites = get_all_sites(session=session)
 
-    ocf_site_group = get_site_group_by_name(
+    ocf_site_group = get_site_group_with_sites(
         session=session, site_group_name=site_group_name
     )
 
-    site_uuids = [site.site_uuid for site in ocf_site_group.sites]
+    site_uuids = {site.site_uuid for site in ocf_site_group.sites}
 
-    sites_added = []
+    new_sites = [site for site in all_sites if site.site_uuid not in site_uuids]
 
-    for site in all_sites:
-        if site.site_uuid not in site_uuids:
-            ocf_site_group.sites.append(site)
-            sites_added.append(str(site.site_uuid))
-            session.commit()
-            message = f"Added {len(sites_added)} sites to group {site_group_name}."
-
-    if len(sites_added) == 0:
+    if not new_sites:
         message = f"There are no new sites to be added to {site_group_name}."
+        return message, []
+
+    ocf_site_group.sites.extend(new_sites)
+    session.commit()
+
+    sites_added = [str(site.site_uuid) for site in new_sites]
+    message = f"Added {len(sites_added)} sites to group {site_group_name}."
 
     return message, sites_added
 
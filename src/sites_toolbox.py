@@ -1,11 +1,10 @@
 """This module contains the sites toolbox for the OCF dashboard"""
 import os
+from functools import lru_cache
+from operator import attrgetter
+
 import streamlit as st
 from sqlalchemy import func
-from pvsite_datamodel.connection import DatabaseConnection
-from pvsite_datamodel.read import (
-    get_all_sites,
-)
 from pvsite_datamodel.read.model import get_models
 from pvsite_datamodel.sqlmodels import SiteAssetType
 
@@ -21,10 +20,14 @@ from pvsite_datamodel.write.user_and_site import (
 
 from pvsite_datamodel.read.user import get_all_users, get_all_site_groups
 
+from get_data import get_all_site_ids
+
 from site_toolbox.get_details import (
     get_user_details,
     get_site_details,
     get_site_group_details,
+    _get_connection,
+    _site_details_cached,
 )
 
 from site_toolbox.site_group_management import (
@@ -35,34 +38,85 @@ from site_toolbox.site_group_management import (
     validate_email,
 )
 
-# colors 7bcdf3 
+# colors 7bcdf3
 # yellow ffd053
 
+# section header html, cached so the constant strings are only built once
+@lru_cache(maxsize=32)
+def _header_html(text: str, color: str, size: int = 32) -> str:
+    """Build the html for a section header"""
+    return f'<h1 style="color:{color};font-size:{size}px;">{text}</h1>'
+
+
+# required text inputs for creating a new site
+_REQUIRED_SITE_FIELDS = ("client_site_name", "latitude", "longitude", "capacity_kw", "country")
+_MISSING_FIELDS_MSG = "Please check that you've entered data for each field. Missing: {fields}"
+
+
+# cached selectbox options, so Streamlit reruns don't re-query the database
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_user_emails(url: str):
+    """Get the emails of all users, cached across reruns"""
+    connection = _get_connection()
+    with connection.get_session() as session:
+        users = get_all_users(session=session)
+        return list(map(attrgetter("email"), users))
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_site_group_names(url: str):
+    """Get the names of all site groups, cached across reruns"""
+    connection = _get_connection()
+    with connection.get_session() as session:
+        site_groups = get_all_site_groups(session=session)
+        return list(map(attrgetter("site_group_name"), site_groups))
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_site_uuids(url: str):
+    """Get the uuids of all sites, cached across reruns"""
+    connection = _get_connection()
+    with connection.get_session() as session:
+        sites = get_all_site_ids(session=session)
+        return list(map(str, map(attrgetter("site_uuid"), sites)))
+
+
+def _clear_cached_lists():
+    """Clear the cached selectbox options after the database has been changed"""
+    _cached_user_emails.clear()
+    _cached_site_group_names.clear()
+    _cached_site_uuids.clear()
+    for key in ("user_list", "site_groups", "site_uuid_list"):
+        st.session_state.pop(key, None)
+
+
 # sites toolbox page
 def sites_toolbox_page():
 
     st.markdown(
-        f'<h1 style="color:#63BCAF;font-size:48px;">{"Sites Toolbox"}</h1>',
+        _header_html("Sites Toolbox", "#63BCAF", size=48),
         unsafe_allow_html=True,
     )
 
     url = os.environ["SITES_DB_URL"]
 
-    connection = DatabaseConnection(
-        url=url,
-        echo=True,
-    )
+    connection = _get_connection()
     with connection.get_session() as session:
-        # get the user details
-        users = get_all_users(session=session)
-        user_list = [user.email for user in users]
-        site_groups = get_all_site_groups(session=session)
-        site_groups = [site_group.site_group_name for site_group in site_groups]
-        site_uuids = get_all_sites(session=session)
-        site_uuid_list = [site.site_uuid for site in site_uuids]
+        # keep the selectbox options in session state, so reruns reuse them
+        if "user_list" not in st.session_state:
+            st.session_state.user_list = _cached_user_emails(url)
+        if "site_groups" not in st.session_state:
+            st.session_state.site_groups = _cached_site_group_names(url)
+        if "site_uuid_list" not in st.session_state:
+            st.session_state.site_uuid_list = _cached_site_uuids(url)
+        all_sites = get_all_site_ids(session=session)
+
+    user_list = st.session_state.user_list
+    site_groups = st.session_state.site_groups
+    site_uuid_list = st.session_state.site_uuid_list
 
     st.markdown(
-        f'<h1 style="color:#63BCAF;font-size:32px;">{"Get User Details"}</h1>',
+        _header_html("Get User Details", "#63BCAF"),
         unsafe_allow_html=True,
     )
     email = st.selectbox("Enter email of user you want to know about.", user_list)
@@ -81,32 +135,30 @@ def sites_toolbox_page():
         st.write(
             "Here are the site_uuids and client_site_ids for this group:", user_sites
         )
-        if st.button("Close user details"):
-            st.empty()
 
     # getting site details
     st.markdown(
-        f'<h1 style="color:#63BCAF;font-size:32px;">{"Get Site Details"}</h1>',
+        _header_html("Get Site Details", "#63BCAF"),
         unsafe_allow_html=True,
     )
     query_method = st.radio("Select site by", ("site_uuid", "client_site_id"))
 
-    site_id = select_site_id(dbsession=session, query_method=query_method)
+    site_id = select_site_id(
+        dbsession=session, query_method=query_method, all_sites=all_sites
+    )
 
     if st.button("Get site details"):
-        site_details = get_site_details(session=session, site_uuid=site_id)
+        site_details = _site_details_cached(url, site_id)
         site_id = (
             site_details["client_site_id"]
             if query_method == "client_site_id"
             else site_details["site_uuid"]
         )
         st.write("Here are the site details for site", site_id, ":", site_details)
-        if st.button("Close site details"):
-            st.empty()
 
     # getting site group details
     st.markdown(
-        f'<h1 style="color:#63BCAF;font-size:32px;">{"Get Site Group Details"}</h1>',
+        _header_html("Get Site Group Details", "#63BCAF"),
         unsafe_allow_html=True,
     )
     site_group_name = st.selectbox("Enter the site group name.", site_groups)
@@ -128,11 +180,9 @@ def sites_toolbox_page():
             "users are part of this group:",
             site_group_users,
         )
-        if st.button("Close site group details"):
-            st.empty()
         # add site to site group
     st.markdown(
-        f'<h1 style="color:#ffd053;font-size:32px;">{"Add Site to Site Group"}</h1>',
+        _header_html("Add Site to Site Group", "#ffd053"),
         unsafe_allow_html=True,
     )
     site_uuid = st.selectbox("Select site", site_uuid_list, key="add")
@@ -141,6 +191,8 @@ def sites_toolbox_page():
         site_group, site_group_sites, site_site_groups = update_site_group(
             session=session, site_uuid=site_uuid, site_group_name=site_group
         )
+        _clear_cached_lists()
+        _site_details_cached.clear()
         st.write(
             "Site",
             site_uuid,
@@ -154,23 +206,20 @@ def sites_toolbox_page():
         st.write(
             "The following site groups include site", site_uuid, ":", site_site_groups
         )
-        if st.button("Close details"):
-            st.empty()
 
     # getting site group details
     st.markdown(
-        f'<h1 style="color:#ffd053;font-size:32px;">{"Add All Sites to OCF Group"}</h1>',
+        _header_html("Add All Sites to OCF Group", "#ffd053"),
         unsafe_allow_html=True,
     )
     if st.button("Add Sites to OCF group"):
         message = add_all_sites_to_ocf_group(session=session, site_group_name="ocf")
+        _clear_cached_lists()
         st.write(message)
-        if st.button("Close details"):
-            st.empty()
 
     # update user site group
     st.markdown(
-        f'<h1 style="color:#ffd053;font-size:32px;">{"Change User Site Group"}</h1>',
+        _header_html("Change User Site Group", "#ffd053"),
         unsafe_allow_html=True,
     )
     email = st.selectbox("Select user whose site group will change.", user_list)
@@ -180,19 +229,18 @@ def sites_toolbox_page():
         user, user_site_group = change_user_site_group(
             session=session, email=email, site_group_name=site_group_name
         )
+        _clear_cached_lists()
         st.write(user, "is now in the", user_site_group, "site group.")
-        if st.button("Close"):
-            st.empty()
 
     # update ml model to site
     st.markdown(
-        f'<h1 style="color:#ffd053;font-size:32px;">{"Assign ML Model to Site"}</h1>',
+        _header_html("Assign ML Model to Site", "#ffd053"),
         unsafe_allow_html=True,
     )
     site_uuid = st.selectbox("Select the site", site_uuid_list)
     with connection.get_session() as session:
         ml_models = get_models(session=session, site_uuid=site_uuid)
-        ml_model_names = [model.name for model in ml_models]
+        ml_model_names = list(map(attrgetter("name"), ml_models))
         ml_model_name = st.selectbox("Select the ml model", ml_model_names)
 
         if st.button("Assign ML Model to Site"):
@@ -201,117 +249,100 @@ def sites_toolbox_page():
 
     # create a new site
     st.markdown(
-        f'<h1 style="color:#7bcdf3;font-size:32px;">{"Create Site"}</h1>',
+        _header_html("Create Site", "#7bcdf3"),
         unsafe_allow_html=True,
     )
     with st.expander("Input new site data"):
         with connection.get_session() as session:
-            st.markdown(
-                f'<h1 style="color:#FFD053;font-size:22px;">{"Client Information"}</h1>',
-                unsafe_allow_html=True,
-            )
-            # ml_id = max_ml_id + 1
-            client_site_id = st.number_input("Client Site Id *", step=1)
-            client_site_name = st.text_input("Client Site Name *")
-
-            st.markdown(
-                f'<h1 style="color:#FFD053;font-size:22px;">{"Geographical Information"}</h1>',
-                unsafe_allow_html=True,
-            )
-
-            latitude = st.text_input("latitude *")
-            longitude = st.text_input("longitude *")
-            region = st.text_input("region")
-            country = st.text_input("Country", value="UK", placeholder="Default is 'UK'")
-            asset_type = st.selectbox(
-                "Asset Type",
-                options=[e.name for e in SiteAssetType],
-                format_func=lambda x: x.replace("_", " ").title(),
-                index=list(SiteAssetType).index(SiteAssetType.pv),  # Default to 'pv'
-            )
-
-            st.markdown(
-                f'<h1 style="color:#FFD053;font-size:22px;">{"PV Information"}</h1>',
-                unsafe_allow_html=True,
-            )
-            capacity_kw = st.text_input("Capacity [kwp] *")
-            orientation = st.text_input("Orientation")
-            tilt = st.text_input("Tilt")
-            inverter_capacity_kw = st.text_input("Inverter capacity [kwp]")
-            module_capacity_kw = st.text_input("Module Capacity [kwp]")
-
-            if st.button(f"Create new site"):
-                if "" in [
-                    client_site_id,
-                    client_site_name,
-                    latitude,
-                    longitude,
-                    capacity_kw,
-                    country,
-                    asset_type,
-                ]:
-                    error = (
-                        f"Please check that you've entered data for each field. "
-                        f"{client_site_id=} {client_site_name=} "
-                        f"{latitude=} {longitude=} {capacity_kw=}"
-                    )
-                    st.write(error)
-                else:  # create new
-                    site, message = create_site(
-                        session=session,
-                        client_site_id=client_site_id,
-                        client_site_name=client_site_name,
-                        region=region,
-                        orientation=orientation,
-                        tilt=tilt,
-                        latitude=latitude,
-                        longitude=longitude,
-                        inverter_capacity_kw=inverter_capacity_kw,
-                        module_capacity_kw=module_capacity_kw,
-                        capacity_kw=capacity_kw,
-                        country=country,
-                        asset_type=asset_type,
-                    )
-                    site_details = {
-                        "site_uuid": str(site.site_uuid),
-                        "ml_id": str(site.ml_id),
-                        "client_site_id": str(site.client_site_id),
-                        "client_site_name": str(site.client_site_name),
-                        "site_group_names": [
-                            site_group.site_group_name
-                            for site_group in site.site_groups
-                        ],
-                        "latitude": str(site.latitude),
-                        "longitude": str(site.longitude),
-                        "country": str(site.country),
-                        "asset_type": str(site.asset_type),
-                        "DNO": str(site.dno),
-                        "GSP": str(site.gsp),
-                        "tilt": str(site.tilt),
-                        "orientation": str(site.orientation),
-                        "inverter_capacity_kw": (f"{site.inverter_capacity_kw} kw"),
-                        "module_capacity_kw": (f"{site.module_capacity_kw} kw"),
-                        "capacity": (f"{site.capacity_kw} kw"),
-                        "date_added": (site.created_utc.strftime("%Y-%m-%d")),
+            # batch the inputs in a form, so typing doesn't rerun the whole page
+            with st.form("new_site_form", clear_on_submit=False):
+                st.markdown(
+                    _header_html("Client Information", "#FFD053", size=22),
+                    unsafe_allow_html=True,
+                )
+                # ml_id = max_ml_id + 1
+                client_site_id = st.number_input("Client Site Id *", step=1)
+                client_site_name = st.text_input("Client Site Name *")
+
+                st.markdown(
+                    _header_html("Geographical Information", "#FFD053", size=22),
+                    unsafe_allow_html=True,
+                )
+
+                latitude = st.text_input("latitude *")
+                longitude = st.text_input("longitude *")
+                region = st.text_input("region")
+                country = st.text_input("Country", value="UK", placeholder="Default is 'UK'")
+                asset_type = st.selectbox(
+                    "Asset Type",
+                    options=[e.name for e in SiteAssetType],
+                    format_func=lambda x: x.replace("_", " ").title(),
+                    index=list(SiteAssetType).index(SiteAssetType.pv),  # Default to 'pv'
+                )
+
+                st.markdown(
+                    _header_html("PV Information", "#FFD053", size=22),
+                    unsafe_allow_html=True,
+                )
+                capacity_kw = st.text_input("Capacity [kwp] *")
+                orientation = st.text_input("Orientation")
+                tilt = st.text_input("Tilt")
+                inverter_capacity_kw = st.text_input("Inverter capacity [kwp]")
+                module_capacity_kw = st.text_input("Module Capacity [kwp]")
+
+                if st.form_submit_button("Create new site"):
+                    required_values = {
+                        "client_site_name": client_site_name,
+                        "latitude": latitude,
+                        "longitude": longitude,
+                        "capacity_kw": capacity_kw,
+                        "country": country,
                     }
-                    st.write(message)
-                    st.write("Here are the site details for the new site")
-                    st.json(site_details)
-                    if st.button("Close site details"):
-                        st.empty()
+                    missing_fields = [
+                        name for name in _REQUIRED_SITE_FIELDS if required_values[name] == ""
+                    ]
+                    if missing_fields:
+                        error = _MISSING_FIELDS_MSG.format_map(
+                            {"fields": ", ".join(missing_fields)}
+                        )
+                        st.write(error)
+                    else:  # create new
+                        site, message = create_site(
+                            session=session,
+                            client_site_id=client_site_id,
+                            client_site_name=client_site_name,
+                            region=region,
+                            orientation=orientation,
+                            tilt=tilt,
+                            latitude=latitude,
+                            longitude=longitude,
+                            inverter_capacity_kw=inverter_capacity_kw,
+                            module_capacity_kw=module_capacity_kw,
+                            capacity_kw=capacity_kw,
+                            country=country,
+                            asset_type=asset_type,
+                        )
+                        _clear_cached_lists()
+                        site_details = get_site_details(
+                            session=session, site_uuid=str(site.site_uuid)
+                        )
+                        site_details["ml_id"] = str(site.ml_id)
+                        st.write(message)
+                        st.write("Here are the site details for the new site")
+                        st.json(site_details)
 
     # create a new user
     st.markdown(
-        f'<h1 style="color:#7bcdf3;font-size:32px;">{"Create User"}</h1>',
+        _header_html("Create User", "#7bcdf3"),
         unsafe_allow_html=True,
     )
 
     with st.expander("Input new user data"):
         with connection.get_session() as session:
             user_list = get_all_users(session=session)
-            user_list = [user.email for user in user_list]
+            user_list = list(map(attrgetter("email"), user_list))
             st.markdown(
-                f'<h1 style="color:#FFD053;font-size:22px;">{"User Information"}</h1>',
+                _header_html("User Information", "#FFD053", size=22),
                 unsafe_allow_html=True,
             )
             email = st.text_input("User Email")
@@ -337,6 +368,7 @@ def sites_toolbox_page():
                         email=email,
                         site_group_name=site_group_name,
                     )
+                    _clear_cached_lists()
 
                     user_details = {
                         "email": str(user.email),
@@ -345,19 +377,17 @@ def sites_toolbox_page():
                     }
                     st.json(user_details)
 
-                if st.button("Close details"):
-                    st.empty()
 
     # create site group
     st.markdown(
-        f'<h1 style="color:#7bcdf3;font-size:32px;">{"Create Site Group"}</h1>',
+        _header_html("Create Site Group", "#7bcdf3"),
         unsafe_allow_html=True,
     )
 
     with st.expander("Input new group data"):
         with connection.get_session() as session:
             st.markdown(
-                f'<h1 style="color:#FFD053;font-size:22px;">{"Site Group Information"}</h1>',
+                _header_html("Site Group Information", "#FFD053", size=22),
                 unsafe_allow_html=True,
             )
             new_site_group_name = st.text_input("Enter new site group name")
@@ -378,6 +408,7 @@ def sites_toolbox_page():
                         db_session=session,
                         site_group_name=new_site_group_name,
                     )
+                    _clear_cached_lists()
                     new_site_group_details = {
                         "site_group": str(new_site_group.site_group_name),
                         "site_group_uuid": str(new_site_group.site_group_uuid),
@@ -385,57 +416,59 @@ def sites_toolbox_page():
                     }
                     st.json(new_site_group_details)
 
-                if st.button("Close details"):
-                    st.empty()
 
 # delete site
     st.markdown(
-        f'<h1 style="color:#E63946;font-size:32px;">{"Delete Site"}</h1>',
+        _header_html("Delete Site", "#E63946"),
         unsafe_allow_html=True,
     )
 
     with st.expander("Input site data"):
         with connection.get_session() as session:
             st.markdown(
-                f'<h1 style="color:#FF9736;font-size:22px;">{"Site UUID"}</h1>',
+                _header_html("Site UUID", "#FF9736", size=22),
                 unsafe_allow_html=True,
             )
             site_uuid = st.selectbox("Enter site uuid", site_uuid_list)
             if st.button("Delete Site"):
                 message = delete_site(session=session, site_uuid=site_uuid)
+                _clear_cached_lists()
+                _site_details_cached.clear()
                 st.write(message)
     
     st.markdown(
-        f'<h1 style="color:#E63946;font-size:32px;">{"Delete User"}</h1>',
+        _header_html("Delete User", "#E63946"),
         unsafe_allow_html=True,
     )
 
     with st.expander("Input user email"):
         with connection.get_session() as session:
             st.markdown(
-                f'<h1 style="color:#FF9736;font-size:22px;">{"User Information"}</h1>',
+                _header_html("User Information", "#FF9736", size=22),
                 unsafe_allow_html=True,
             )
             email = st.selectbox("Enter user email", user_list)
             if st.button("Delete User"):
                 message = delete_user(session=session, email=email)
+                _clear_cached_lists()
                 st.write(message)
 
 # delete site group
     st.markdown(
-        f'<h1 style="color:#E63946;font-size:32px;">{"Delete Site Group"}</h1>',
+        _header_html("Delete Site Group", "#E63946"),
         unsafe_allow_html=True,
     )
 
     with st.expander("Input site group information"):
         with connection.get_session() as session:
             site_groups = get_all_site_groups(session=session)
-            site_groups = [site_group.site_group_name for site_group in site_groups]
+            site_groups = list(map(attrgetter("site_group_name"), site_groups))
             st.markdown(
-                f'<h1 style="color:#FF9736;font-size:22px;">{"Site Group Information"}</h1>',
+                _header_html("Site Group Information", "#FF9736", size=22),
                 unsafe_allow_html=True,
             )
             site_group_name = st.selectbox("Enter site group", site_groups)
             if st.button("Delete Site Group"):
                 message = delete_site_group(session=session, site_group_name=site_group_name)
+                _clear_cached_lists()
                 st.write(message)
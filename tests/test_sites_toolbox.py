@@ -8,6 +8,7 @@ from sites_toolbox import (
     update_site_group,
     add_all_sites_to_ocf_group,
 )
+from get_data import get_all_site_ids
 from pvsite_datamodel.sqlmodels import SiteAssetType
 
 from pvsite_datamodel.write.user_and_site import make_fake_site, create_site_group, create_user
@@ -78,12 +79,17 @@ def test_get_site_details(db_session):
 def test_select_site_id(db_session):
     """Test the select site id function"""
     site = make_fake_site(db_session=db_session, ml_id=1)
+    all_sites = get_all_site_ids(session=db_session)
 
-    site_uuid = select_site_id(dbsession=db_session, query_method="site_uuid")
+    site_uuid = select_site_id(
+        dbsession=db_session, query_method="site_uuid", all_sites=all_sites
+    )
 
     assert site_uuid == str(site.site_uuid)
 
-    site_uuid = select_site_id(dbsession=db_session, query_method="client_site_id")
+    site_uuid = select_site_id(
+        dbsession=db_session, query_method="client_site_id", all_sites=all_sites
+    )
     assert site_uuid == str(site.site_uuid)
 
 